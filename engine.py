@@ -0,0 +1,1396 @@
+import time
+_T0 = time.perf_counter()
+import os
+import sys
+import importlib
+import json
+import datetime
+import urllib.parse
+import re
+import html
+import random
+import shutil
+import threading
+import contextvars
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+
+# google.genai / bs4 / feedparser / requests / smtplib 등 무거운 모듈은 실제로 쓰는 순간에 로드 (lazy_import)
+
+# --- 환경 변수 로드 (GitHub Actions 용) ---
+# 카테고리별 키는 categories.json의 api_key_env 로 지정, 없으면 GEMINI_API_KEY 사용
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+UNSPLASH_ACCESS_KEY = os.environ.get("UNSPLASH_ACCESS_KEY")
+GMAIL_USER = os.environ.get("GMAIL_USER")
+GMAIL_APP_PASSWORD = os.environ.get("GMAIL_APP_PASSWORD")
+
+MODEL_ID = 'gemini-3-flash-preview'
+REGISTRY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'categories.json')
+HISTORY_FILE = 'history.json'
+ENGINE_CONCURRENCY = int(os.environ.get("ENGINE_CONCURRENCY", "4"))
+RUN_ROOT = 'runs'
+RUN_KEEP_DAYS = 7
+HOST_STATS_FILE = os.path.join('store', 'host_stats.json')
+ARTICLE_STORE_FILE = os.path.join('store', 'articles.json')
+CANDIDATE_MAX_AGE_DAYS = 3
+FEED_STATS_FILE = os.path.join('store', 'feed_stats.json')
+CORPUS_FILE = os.path.join('store', 'corpus.db')
+CORPUS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (id TEXT PRIMARY KEY, mode TEXT, title TEXT, raw TEXT, published TEXT, fetched_at TEXT);
+CREATE TABLE IF NOT EXISTS posted_articles (id TEXT PRIMARY KEY, title TEXT, date TEXT, mode TEXT);
+CREATE TABLE IF NOT EXISTS tistory_posts (link TEXT PRIMARY KEY, title TEXT, seen_at TEXT);
+CREATE TABLE IF NOT EXISTS posts (id INTEGER PRIMARY KEY AUTOINCREMENT, mode TEXT, subject TEXT, html TEXT, created_at TEXT);
+CREATE VIRTUAL TABLE IF NOT EXISTS corpus_fts USING fts5(kind UNINDEXED, ref UNINDEXED, title, body, tokenize='unicode61');
+"""
+# 긴 것부터 검사 (예: "에서는"을 "는"보다 먼저)
+KOREAN_SUFFIXES = ("에서는", "으로는", "에게서", "이라는", "에서", "에게", "으로", "까지", "부터", "보다", "처럼", "이나", "라는",
+                   "하는", "했다", "한다", "은", "는", "이", "가", "을", "를", "의", "에", "와", "과", "도", "로", "만", "한", "된")
+FEED_BREAKER_THRESHOLD = 3
+FEED_BREAKER_MAX_HOURS = 24
+SCRAPE_HEDGE = os.environ.get("SCRAPE_HEDGE") == "1"
+PROFILE_STAGES = "--profile" in sys.argv or os.environ.get("PROFILE_STAGES") == "1"
+PROFILE_SAMPLE_INTERVAL = 0.005
+RUN_BUDGET_SECONDS = float(os.environ.get("RUN_BUDGET_SECONDS", "1500"))
+# 단계별 예산 비율 (앞 단계에서 남긴 시간은 뒤 단계로 이월)
+STAGE_BUDGET_SHARES = {"candidates": 0.2, "selection": 0.05, "titles": 0.1, "raw_html": 0.4, "final_html": 0.15, "subject": 0.05, "send": 0.05}
+LLM_CALL_ESTIMATE = 30
+DEFAULT_SUBJECT = "오늘의 핵심 분석"
+LLM_MAX_TIMEOUT = 600
+LLM_MIN_TIMEOUT = 10
+FEED_MAX_TIMEOUT = 10
+SPECULATIVE_PREFETCH = 4
+OUTBOX_DIR = os.path.join('store', 'outbox')
+OUTBOX_QUARANTINE_DIR = os.path.join(OUTBOX_DIR, 'quarantine')
+OUTBOX_RETRIES = 3
+OUTBOX_DEFER = os.environ.get("OUTBOX_DEFER") == "1"
+EMAIL_COMPACT = os.environ.get("EMAIL_COMPACT") == "1"
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "465"))
+SMTP_USE_SSL = os.environ.get("SMTP_SSL", "1") == "1"
+SCRAPE_MAX_TIMEOUT = 5
+SCRAPE_MIN_TIMEOUT = 1.5
+# 원문으로 넘겨주기만 하는 링크 호스트 (그 밖의 호스트도 리다이렉트가 관측되면 자동 추가)
+REDIRECT_HOSTS = {"news.google.com"}
+IMAGE_WIDTHS = [480, 768, 1080, 1600]
+IMAGE_DISPLAY_WIDTH = 1080
+POST_GREETING = "안녕하세요, 스포(Spo)입니다."
+POST_MIN_LENGTH_RATIO = 0.8
+
+_registry = None
+_host_stats = None
+_feed_stats = None
+_corpus = None
+_corpus_disabled = False
+_corpus_rebuilt = False
+_smtp = None
+_fetch_pool = None
+_prefetch_pool = None
+_tistory_posts = None
+_clients = {}
+_import_times = {}
+# 여러 카테고리가 스레드로 동시에 도는 동안 공유 캐시/SQLite 접근 보호
+_shared_lock = threading.RLock()
+_tistory_lock = threading.Lock()
+# 병렬로 도는 카테고리끼리 같은 기사를 고르지 않도록 이번 실행에서 선정된 기사 id 예약
+_reserved_ids = set()
+# 카테고리 스레드마다 다른 값: 현재 카테고리(API 키 선택용), 실행 마감 관리
+_current_mode = contextvars.ContextVar('current_mode', default=None)
+_deadline = contextvars.ContextVar('deadline', default=None)
+
+def lazy_import(name):
+    # sys.modules를 직접 보지 않고 import_module을 거쳐야 다른 스레드가 import 중인 모듈을 반쯤 초기화된 채 받지 않음
+    loaded = name in sys.modules
+    start = time.perf_counter()
+    mod = importlib.import_module(name)
+    if not loaded: _import_times.setdefault(name, time.perf_counter() - start)
+    return mod
+
+def load_registry():
+    # categories.json: 카테고리별 피드, 대체 이미지 키워드, 면책 문구, 요일, API 키 환경변수
+    global _registry
+    if _registry is None:
+        with open(REGISTRY_FILE, 'r', encoding='utf-8') as f: _registry = json.load(f)['categories']
+    return _registry
+
+def get_category(mode):
+    for c in load_registry():
+        if c['name'] == mode: return c
+    raise KeyError(f"categories.json에 없는 카테고리: {mode}")
+
+def get_client():
+    # genai.Client는 API 키별로 첫 LLM 호출 때 한 번만 생성해서 카테고리 간 공유
+    mode = _current_mode.get()
+    api_key = (os.environ.get(get_category(mode).get('api_key_env', '')) if mode else None) or GEMINI_API_KEY
+    with _shared_lock:
+        if api_key not in _clients:
+            genai = lazy_import('google.genai')
+            _clients[api_key] = genai.Client(api_key=api_key, http_options={'timeout': 600000})
+        return _clients[api_key]
+
+def print_startup_report():
+    # python -X importtime 과 같은 형식으로 지연 로드된 모듈의 import 비용 출력
+    print("import time: cumulative [us] | package")
+    for name, sec in sorted(_import_times.items(), key=lambda kv: kv[1]):
+        print(f"import time: {int(sec * 1e6):>16} | {name}")
+    print(f"⏱️ 총 실행 시간: {(time.perf_counter() - _T0) * 1000:.1f} ms")
+
+def load_history(filepath):
+    if not os.path.exists(filepath): return []
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f: return json.load(f)
+    except: return []
+
+def save_history(filepath, history, new_items):
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=30)
+    cleaned = []
+    for item in history:
+        try:
+            d = datetime.datetime.strptime(item.get('date', '2000-01-01'), "%Y-%m-%d")
+            if d >= cutoff: cleaned.append(item)
+        except: continue
+    today = datetime.datetime.now().strftime("%Y-%m-%d")
+    known_ids = {item.get('id') for item in cleaned}
+    for item in new_items:
+        if item['id'] in known_ids: continue
+        cleaned.append({"id": item['id'], "title": item['title'], "date": today})
+    with open(filepath, 'w', encoding='utf-8') as f: json.dump(cleaned, f, ensure_ascii=False, indent=4)
+
+def get_run_dir(mode):
+    # 단계별 체크포인트 저장 위치: runs/<KST 날짜>_<모드>/
+    today = (datetime.datetime.now() + datetime.timedelta(hours=9)).strftime("%Y-%m-%d")
+    if os.path.isdir(RUN_ROOT):
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=RUN_KEEP_DAYS)
+        for name in os.listdir(RUN_ROOT):
+            try:
+                if datetime.datetime.strptime(name.split('_')[0], "%Y-%m-%d") < cutoff:
+                    shutil.rmtree(os.path.join(RUN_ROOT, name), ignore_errors=True)
+            except ValueError: continue
+    return os.path.join(RUN_ROOT, f"{today}_{mode}")
+
+def load_checkpoint(run_dir, stage):
+    path = os.path.join(run_dir, f"{stage}.json")
+    if not os.path.exists(path): return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f: return json.load(f)
+    except: return None
+
+def save_checkpoint(run_dir, stage, data):
+    os.makedirs(run_dir, exist_ok=True)
+    path = os.path.join(run_dir, f"{stage}.json")
+    with open(path + '.tmp', 'w', encoding='utf-8') as f: json.dump(data, f, ensure_ascii=False, indent=4)
+    os.replace(path + '.tmp', path)
+
+def _sample_stacks(thread_id, stop, counts):
+    # 주기적으로 대상 스레드의 콜스택을 떠서 flamegraph.pl 용 collapsed 형식으로 집계
+    while not stop.wait(PROFILE_SAMPLE_INTERVAL):
+        frame = sys._current_frames().get(thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if stack:
+            key = ";".join(reversed(stack))
+            counts[key] = counts.get(key, 0) + 1
+
+def profile_stage(run_dir, stage, fn):
+    # --profile: 단계별 cProfile(.prof), collapsed stacks, tracemalloc 상위 할당 위치를 runs/.../profile/ 에 저장
+    if not PROFILE_STAGES: return fn()
+    cProfile, tracemalloc = lazy_import('cProfile'), lazy_import('tracemalloc')
+    out_dir = os.path.join(run_dir, 'profile')
+    os.makedirs(out_dir, exist_ok=True)
+    counts, stop = {}, threading.Event()
+    sampler = threading.Thread(target=_sample_stacks, args=(threading.get_ident(), stop, counts), daemon=True)
+    prof = cProfile.Profile()
+    tracemalloc.start(25)
+    sampler.start()
+    start = time.perf_counter()
+    prof.enable()
+    try: return fn()
+    finally:
+        prof.disable()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        sampler.join()
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        prof.dump_stats(os.path.join(out_dir, f"{stage}.prof"))
+        with open(os.path.join(out_dir, f"{stage}.collapsed"), 'w', encoding='utf-8') as f:
+            for key, count in sorted(counts.items()): f.write(f"{key} {count}\n")
+        with open(os.path.join(out_dir, f"{stage}.alloc.txt"), 'w', encoding='utf-8') as f:
+            f.write(f"peak: {peak / 1e6:.2f} MB\n")
+            for stat in snapshot.statistics('lineno')[:25]: f.write(f"{stat}\n")
+        with open(os.path.join(out_dir, "summary.txt"), 'a', encoding='utf-8') as f:
+            f.write(f"{stage}\t{elapsed:.3f}s\tpeak {peak / 1e6:.2f} MB\n")
+        print(f"🔬 [{stage}] {elapsed:.2f}s, peak {peak / 1e6:.1f} MB → {out_dir}")
+
+class RunDeadline:
+    def __init__(self, budget, shares):
+        self.start = time.monotonic()
+        self.budget, self.shares = budget, shares
+        self.stage, self.stage_end = None, self.start + budget
+        self.degraded = {}
+
+    def begin(self, stage):
+        # 단계 마감 = 시작 시각 + 이 단계까지의 누적 비율 x 전체 예산
+        stages = list(self.shares)
+        share = sum(self.shares[s] for s in stages[:stages.index(stage) + 1]) if stage in self.shares else 1
+        self.stage, self.stage_end = stage, self.start + self.budget * share
+
+    def stage_left(self):
+        return self.stage_end - time.monotonic()
+
+    def left(self):
+        return self.start + self.budget - time.monotonic()
+
+    def note(self, what):
+        key = f"{self.stage}: {what}"
+        if key not in self.degraded: print(f"⏳ 시간 부족 → {key}")
+        self.degraded[key] = self.degraded.get(key, 0) + 1
+
+def deadline_short(need_seconds):
+    deadline = _deadline.get()
+    return deadline is not None and deadline.stage_left() < need_seconds
+
+def note_degradation(what):
+    deadline = _deadline.get()
+    if deadline is not None: deadline.note(what)
+
+def degraded_with(stage, what):
+    # 이 단계에서 마감 때문에 해당 대체 결과를 쓴 적이 있는지 (그렇다면 대체 결과도 체크포인트로 확정)
+    deadline = _deadline.get()
+    return deadline is not None and f"{stage}: {what}" in deadline.degraded
+
+def time_left_in_stage(default, floor):
+    # 마감이 걸린 실행이면 네트워크/LLM 호출 타임아웃을 단계 잔여 시간으로 제한
+    deadline = _deadline.get()
+    if deadline is None: return default
+    return max(floor, min(default, deadline.stage_left()))
+
+def generate_content(prompt):
+    # 클라이언트 기본 600s 대신 호출마다 남은 단계 예산으로 타임아웃 지정 (http_options.timeout 은 ms 단위)
+    timeout_ms = int(time_left_in_stage(LLM_MAX_TIMEOUT, LLM_MIN_TIMEOUT) * 1000)
+    return get_client().models.generate_content(model=MODEL_ID, contents=prompt, config={'http_options': {'timeout': timeout_ms}})
+
+def pace(seconds):
+    # API 호출 사이 고정 대기. 남은 예산이 부족하면 대기를 건너뜀
+    if deadline_short(seconds + LLM_CALL_ESTIMATE):
+        note_degradation(f"{seconds}s 대기 생략")
+        return
+    time.sleep(seconds)
+
+def run_stage(run_dir, stage, fn, valid=None):
+    # 이미 끝난 단계는 체크포인트를 그대로 쓰고, 새로 만든 결과는 유효할 때만 저장
+    data = load_checkpoint(run_dir, stage)
+    if data is not None:
+        print(f"⏩ [{stage}] 체크포인트에서 재개.")
+        return data
+    if _deadline.get() is not None: _deadline.get().begin(stage)
+    data = profile_stage(run_dir, stage, fn)
+    if valid is None or valid(data): save_checkpoint(run_dir, stage, data)
+    return data
+
+def is_generation_error(html_text):
+    return html_text.startswith("<p>에러:") or html_text.startswith("<h3>🚨 AI API 에러")
+
+def get_tistory_published_posts(rss_url="https://spo26.tistory.com/rss"):
+    # 모든 카테고리가 같은 블로그 RSS를 쓰므로 실행당 한 번만 받아서 공유
+    # 받는 동안은 전용 락만 잡아서 다른 카테고리의 공유 캐시/SQLite 접근을 막지 않음
+    global _tistory_posts
+    with _tistory_lock:
+        if _tistory_posts is not None: return list(_tistory_posts)
+        posts = []
+        try:
+            res = lazy_import('requests').get(rss_url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=time_left_in_stage(FEED_MAX_TIMEOUT, 1))
+            feed = lazy_import('feedparser').parse(res.content)
+            for entry in feed.entries[:15]:
+                posts.append({'title': entry.title, 'link': entry.link})
+        except: pass
+        if posts: _tistory_posts = posts
+        return list(posts)
+
+def load_host_stats():
+    global _host_stats
+    with _shared_lock:
+        if _host_stats is not None: return _host_stats
+        try:
+            with open(HOST_STATS_FILE, 'r', encoding='utf-8') as f: _host_stats = json.load(f)
+        except: _host_stats = {}
+    return _host_stats
+
+def save_host_stats():
+    if _host_stats is None: return
+    os.makedirs(os.path.dirname(HOST_STATS_FILE), exist_ok=True)
+    with open(HOST_STATS_FILE, 'w', encoding='utf-8') as f: json.dump(_host_stats, f, ensure_ascii=False, indent=4)
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def host_policy(host):
+    # 호스트별 과거 기록으로 (건너뛸지, 타임아웃, 헤지 대기시간) 결정
+    st = load_host_stats().get(host, {})
+    # 구글 뉴스처럼 다른 호스트로 넘겨주기만 하는 링크 호스트는 기록이 여러 언론사 것이 섞이므로 기본값 사용
+    if host in REDIRECT_HOSTS or st.get('redirects'): return False, SCRAPE_MAX_TIMEOUT, SCRAPE_MAX_TIMEOUT / 2
+    recent, latencies = st.get('recent', []), st.get('latencies', [])
+    # 최근 4회 이상 쓸만한 본문을 못 준 호스트는 바로 요약문으로 (10% 확률로만 재시도)
+    if len(recent) >= 4 and 'u' not in recent and random.random() > 0.1: return True, 0, 0
+    if len(latencies) < 5: return False, SCRAPE_MAX_TIMEOUT, SCRAPE_MAX_TIMEOUT / 2
+    timeout = min(SCRAPE_MAX_TIMEOUT, max(SCRAPE_MIN_TIMEOUT, _percentile(latencies, 0.95) * 1.5))
+    return False, timeout, min(timeout, _percentile(latencies, 0.75))
+
+def record_host_result(host, outcome, latency=None):
+    # outcome: 'u' 쓸만한 본문, 'e' 본문 부족, 'f' 실패/타임아웃
+    st = load_host_stats().setdefault(host, {'recent': [], 'latencies': []})
+    st['recent'] = (st['recent'] + [outcome])[-10:]
+    if latency is not None: st['latencies'] = (st['latencies'] + [round(latency, 3)])[-30:]
+
+def _timed_get(url, timeout):
+    requests = lazy_import('requests')
+    start = time.monotonic()
+    res = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=timeout)
+    res.raise_for_status()
+    return res, time.monotonic() - start
+
+def hedged_get(url, timeout, hedge_after):
+    # 첫 요청이 hedge_after 안에 안 끝나면 같은 요청을 하나 더 보내고 먼저 온 응답 사용
+    global _fetch_pool
+    futures = lazy_import('concurrent.futures')
+    with _shared_lock:
+        if _fetch_pool is None: _fetch_pool = futures.ThreadPoolExecutor(max_workers=8)
+    wait, FIRST_COMPLETED = futures.wait, futures.FIRST_COMPLETED
+    first = _fetch_pool.submit(_timed_get, url, timeout)
+    done, _ = wait([first], timeout=hedge_after)
+    if done: return first.result()
+    pending, error = {first, _fetch_pool.submit(_timed_get, url, timeout)}, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            if f.exception() is None: return f.result()
+            error = f.exception()
+    raise error
+
+def scrape_article_text(url):
+    host = urllib.parse.urlparse(url).netloc
+    skip, timeout, hedge_after = host_policy(host)
+    if skip: return None
+    final_host = host
+    try:
+        if SCRAPE_HEDGE: res, latency = hedged_get(url, timeout, hedge_after)
+        else: res, latency = _timed_get(url, timeout)
+        # 결과는 리다이렉트를 따라간 뒤의 실제 원문 호스트(res.url) 기준으로 기록
+        final_host = urllib.parse.urlparse(res.url).netloc or host
+        if final_host != host:
+            with _shared_lock: load_host_stats().setdefault(host, {'recent': [], 'latencies': []})['redirects'] = True
+        soup = lazy_import('bs4').BeautifulSoup(res.text, 'html.parser')
+        paragraphs = soup.find_all('p')
+        text = " ".join([p.get_text() for p in paragraphs])
+        record_host_result(final_host, 'u' if len(text) > 100 else 'e', latency)
+        return text[:3000] if len(text) > 100 else None 
+    except:
+        record_host_result(final_host, 'f')
+        return None
+
+def parse_feed_date(text):
+    if not text: return None
+    try: d = lazy_import('email.utils').parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        try: d = datetime.datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError: return None
+    if d.tzinfo is None: d = d.replace(tzinfo=datetime.timezone.utc)
+    return d
+
+def _local_tag(el):
+    return el.tag.rsplit('}', 1)[-1]
+
+def _entry_from_element(el):
+    def first_text(*names):
+        # names 순서가 우선순위 (문서 순서와 무관하게 <summary>가 <content>보다 먼저)
+        for name in names:
+            for child in el:
+                if _local_tag(child) == name and (child.text or '').strip(): return child.text.strip()
+        return ''
+    link = first_text('link')
+    if not link:
+        # Atom: <link rel="alternate" href="..."/>
+        for child in el:
+            if _local_tag(child) == 'link' and child.get('rel', 'alternate') == 'alternate' and child.get('href'):
+                link = child.get('href')
+                break
+    return {"title": first_text('title'), "link": link,
+            "summary": first_text('description', 'summary', 'content'),
+            "published": parse_feed_date(first_text('pubDate', 'published', 'updated'))}
+
+def _entry_from_feedparser(e):
+    return {"title": e.get('title', ''), "link": e.get('link', ''), "summary": e.get('summary', ''),
+            "published": parse_feed_date(e.get('published') or e.get('updated'))}
+
+class _TeeReader:
+    # iterparse가 읽은 바이트를 남겨 두었다가 파싱이 깨지면 feedparser에 문서 전체를 넘김
+    def __init__(self, raw):
+        self.raw, self.buf = raw, bytearray()
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.buf += data
+        return data
+
+def _parse_feed_stream(res, url):
+    tee, root = _TeeReader(res.raw), None
+    try:
+        for event, el in ET.iterparse(tee, events=('start', 'end')):
+            if event == 'start':
+                # 정상 XML이지만 피드가 아닌 문서(XHTML 차단 페이지 등)도 피드 장애로 집계
+                if root is None:
+                    root = _local_tag(el)
+                    if root not in ('rss', 'feed', 'RDF'): raise ValueError(f"피드 문서가 아님: <{root}>")
+                continue
+            if _local_tag(el) not in ('item', 'entry'): continue
+            entry = _entry_from_element(el)
+            el.clear()
+            yield entry
+    except ET.ParseError as e:
+        # 미선언 엔티티(&nbsp; 등)/깨진 바이트: 관대한 feedparser로 문서 전체를 다시 읽어 나머지 항목 복구
+        print(f"⚠️ 피드 XML 파싱 오류 ({e}), feedparser로 복구: {url}")
+        tee.read()
+        recovered = lazy_import('feedparser').parse(bytes(tee.buf)).entries
+        # HTML 차단 페이지처럼 복구할 항목이 없으면 피드 장애로 집계 (이미 넘긴 항목이 있으면 그것만 유지)
+        if not recovered: raise
+        for item in recovered: yield _entry_from_feedparser(item)
+
+def iter_feed_entries(url, cutoff=None, known_sorted=False, order=None):
+    # 피드 전체를 한 번에 만들지 않고 <item>/<entry> 단위로 흘려보냄.
+    # 이전 실행에서 날짜 내림차순이 확인된 피드(known_sorted)만 cutoff 이전 항목에서 조기 중단하고,
+    # 그 외(Google News 검색 결과 등)는 오래된 항목만 하나씩 건너뜀.
+    # order: 이번에 관찰한 정렬 여부를 돌려받는 dict ({'sorted': bool, 'complete': bool})
+    order = order if order is not None else {}
+    order.update(sorted=True, complete=False)
+    timeout = time_left_in_stage(FEED_MAX_TIMEOUT, 1)
+    res = lazy_import('requests').get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=timeout, stream=True)
+    try:
+        res.raise_for_status()
+        res.raw.decode_content = True
+        prev_date, seen, yielded = None, set(), 0
+        try:
+            for entry in _parse_feed_stream(res, url):
+                # feedparser 복구는 문서 처음부터 다시 나오므로 이미 본 항목은 건너뜀
+                key = entry['link'] or entry['title']
+                if key in seen: continue
+                seen.add(key)
+                pub = entry['published']
+                if pub:
+                    if prev_date and pub > prev_date: order['sorted'] = False
+                    prev_date = pub
+                if cutoff and pub and pub < cutoff:
+                    if known_sorted and order['sorted']: break
+                    continue
+                if entry['link']:
+                    yielded += 1
+                    yield entry
+            order['complete'] = True
+        except ET.ParseError as e:
+            # 한 항목도 못 넘겼으면 피드 장애로 집계 (서킷 브레이커 대상)
+            if not yielded: raise
+            print(f"⚠️ 피드 XML 파싱 중단 ({e}), 읽은 항목만 사용: {url}")
+    finally: res.close()
+
+def load_feed_stats():
+    global _feed_stats
+    with _shared_lock:
+        if _feed_stats is not None: return _feed_stats
+        try:
+            with open(FEED_STATS_FILE, 'r', encoding='utf-8') as f: _feed_stats = json.load(f)
+        except: _feed_stats = {}
+    return _feed_stats
+
+def save_feed_stats():
+    if _feed_stats is None: return
+    os.makedirs(os.path.dirname(FEED_STATS_FILE), exist_ok=True)
+    with open(FEED_STATS_FILE, 'w', encoding='utf-8') as f: json.dump(_feed_stats, f, ensure_ascii=False, indent=4)
+
+def get_feed_stats(url):
+    st = load_feed_stats().setdefault(url, {})
+    for key in ('fetches', 'errors', 'consecutive_errors', 'items', 'scrape_attempts', 'scraped', 'selected'): st.setdefault(key, 0)
+    st.setdefault('latencies', [])
+    st.setdefault('open_until', None)
+    return st
+
+def feed_circuit_open(url):
+    open_until = get_feed_stats(url)['open_until']
+    return bool(open_until) and datetime.datetime.fromisoformat(open_until) > datetime.datetime.now()
+
+def record_feed_result(url, latency, ok):
+    # 연속 실패가 임계값을 넘으면 1h, 2h, 4h... (최대 24h) 동안 피드를 건너뜀
+    st = get_feed_stats(url)
+    st['latencies'] = (st['latencies'] + [round(latency, 3)])[-20:]
+    if ok:
+        st['consecutive_errors'], st['open_until'] = 0, None
+        return
+    st['errors'] += 1
+    st['consecutive_errors'] += 1
+    if st['consecutive_errors'] >= FEED_BREAKER_THRESHOLD:
+        hours = min(FEED_BREAKER_MAX_HOURS, 2 ** (st['consecutive_errors'] - FEED_BREAKER_THRESHOLD))
+        st['open_until'] = (datetime.datetime.now() + datetime.timedelta(hours=hours)).isoformat()
+
+def record_feed_selection(selected):
+    for item in selected:
+        if item.get('feed'): get_feed_stats(item['feed'])['selected'] += 1
+    return selected
+
+def feed_score(url):
+    # 실행당 신선한 기사 수 x 본문 수집 성공률 + 선정 가중치. 기록이 없는 피드는 먼저 시도
+    st = get_feed_stats(url)
+    if not st['fetches']: return float('inf')
+    scrape_rate = st['scraped'] / st['scrape_attempts'] if st['scrape_attempts'] else 0
+    return (st['items'] * (0.5 + scrape_rate) + 5 * st['selected']) / st['fetches']
+
+def prioritized_feed_urls(mode):
+    return sorted(get_feed_urls(mode), key=feed_score, reverse=True)
+
+def print_feed_report(mode):
+    print(f"📊 [{mode}] 피드 상태")
+    print(f"{'score':>7} {'fetch':>5} {'err%':>5} {'p50s':>5} {'yield':>5} {'scrape%':>7} {'sel':>4}  state  feed")
+    for url in prioritized_feed_urls(mode):
+        st = get_feed_stats(url)
+        fetches = st['fetches'] or 1
+        p50 = _percentile(st['latencies'], 0.5) if st['latencies'] else 0
+        scrape_pct = 100 * st['scraped'] / st['scrape_attempts'] if st['scrape_attempts'] else 0
+        state = "OPEN " if feed_circuit_open(url) else "ok   "
+        score = feed_score(url)
+        print(f"{score if score != float('inf') else 0:>7.2f} {st['fetches']:>5} {100 * st['errors'] / fetches:>5.0f} {p50:>5.1f} "
+              f"{st['items'] / fetches:>5.1f} {scrape_pct:>7.0f} {st['selected']:>4}  {state}  {url[:70]}")
+
+def fetch_rss(url, category, skip_ids=None, scrape=True):
+    if feed_circuit_open(url):
+        print(f"⛔ 피드 일시 차단 중 (연속 실패): {url}")
+        return
+    if deadline_short(1):
+        note_degradation("남은 피드 건너뜀")
+        return
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=CANDIDATE_MAX_AGE_DAYS)
+    st = get_feed_stats(url)
+    st['fetches'] += 1
+    # 피드 자체의 대기/파싱 시간만 측정 (기사 본문 수집 시간은 제외)
+    order = {}
+    feed_time, entries = 0.0, iter_feed_entries(url, cutoff, st.get('date_sorted', False), order)
+    try:
+        while True:
+            if deadline_short(1):
+                # 피드를 끝까지 읽을 시간이 없으면 지금까지 받은 항목만 사용
+                note_degradation("피드 읽기 중단")
+                break
+            start = time.monotonic()
+            try: entry = next(entries)
+            except StopIteration: break
+            finally: feed_time += time.monotonic() - start
+            st['items'] += 1
+            if skip_ids and entry['link'] in skip_ids: continue
+            raw_text = None
+            if not scrape: pass
+            elif deadline_short(SCRAPE_MAX_TIMEOUT): note_degradation("본문 수집 대신 RSS 요약 사용")
+            else:
+                raw_text = scrape_article_text(entry['link'])
+                st['scrape_attempts'] += 1
+                if raw_text: st['scraped'] += 1
+            if not raw_text: raw_text = (entry['summary'] or entry['title'])[:2000]
+            published = entry['published'].isoformat() if entry['published'] else None
+            yield {"id": entry['link'], "title": entry['title'], "type": category, "raw": raw_text, "published": published, "feed": url, "scraped": scrape}
+        # 정렬이 깨진 건 부분 관찰로도 확정, 정렬됨은 끝까지(또는 조기 중단까지) 읽었을 때만 기록
+        if order.get('complete') or order.get('sorted') is False: st['date_sorted'] = order['sorted']
+        record_feed_result(url, feed_time, ok=True)
+    except Exception: record_feed_result(url, feed_time, ok=False)
+    finally: entries.close()
+
+def get_feed_urls(mode):
+    return list(get_category(mode)['feeds'])
+
+def load_article_store():
+    try:
+        with open(ARTICLE_STORE_FILE, 'r', encoding='utf-8') as f: return json.load(f)
+    except: return {}
+
+def save_article_store(store):
+    os.makedirs(os.path.dirname(ARTICLE_STORE_FILE), exist_ok=True)
+    with open(ARTICLE_STORE_FILE + '.tmp', 'w', encoding='utf-8') as f: json.dump(store, f, ensure_ascii=False, indent=4)
+    os.replace(ARTICLE_STORE_FILE + '.tmp', ARTICLE_STORE_FILE)
+
+def _fresh_articles(bucket):
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=CANDIDATE_MAX_AGE_DAYS)
+    fresh = {}
+    for link, item in bucket.items():
+        stamp = parse_feed_date(item.get('published') or item.get('fetched_at'))
+        if stamp and stamp >= cutoff: fresh[link] = item
+    return fresh
+
+def ingest_candidates(mode):
+    # 매시간 실행되는 수집 모드: 새 기사만 본문까지 긁어서 로컬 저장소에 누적
+    bucket = _fresh_articles(load_article_store().get(mode, {}))
+    added = 0
+    for u in prioritized_feed_urls(mode):
+        for item in fetch_rss(u, mode, skip_ids=bucket):
+            item['fetched_at'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            bucket[item['id']] = item
+            added += 1
+    with _shared_lock:
+        # 다른 카테고리가 그 사이 저장했을 수 있으므로 다시 읽고 내 카테고리만 교체
+        store = load_article_store()
+        store[mode] = bucket
+        save_article_store(store)
+    corpus_add_articles(list(bucket.values()))
+    print(f"📥 [{mode}] 신규 {added}건 저장 (보관 {len(bucket)}건).")
+    return added
+
+def get_corpus():
+    # 기사 본문/발행 글/티스토리 제목을 한 곳에 모은 SQLite FTS5 코퍼스 (WAL 모드)
+    # 연결 하나를 카테고리 스레드들이 공유하므로 with_corpus()로 _shared_lock 안에서 접근
+    global _corpus
+    if _corpus is None:
+        os.makedirs(os.path.dirname(CORPUS_FILE), exist_ok=True)
+        conn = lazy_import('sqlite3').connect(CORPUS_FILE, check_same_thread=False)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(CORPUS_SCHEMA)
+        except Exception:
+            conn.close()
+            raise
+        _corpus = conn
+    return _corpus
+
+def close_corpus():
+    global _corpus
+    if _corpus is None: return
+    try: _corpus.close()
+    except Exception: pass
+    _corpus = None
+
+def with_corpus(fn, default):
+    # 코퍼스는 보조 가속 수단: SQLite 오류가 나도 글 발행은 계속 (관련 글/중복 제거/저장만 생략)
+    # 손상된 DB 파일은 옆으로 옮기고 다음 호출에서 새로 만들고, 그래도 안 되면(FTS5 미지원 등) 이번 실행은 끔
+    global _corpus_disabled
+    sqlite3 = lazy_import('sqlite3')
+    with _shared_lock:
+        if _corpus_disabled: return default
+        try: return fn(get_corpus())
+        except sqlite3.DatabaseError as e:
+            print(f"⚠️ 코퍼스 사용 불가, 건너뜀: {e}")
+            close_corpus()
+            # "file is not a database", "disk image is malformed" 등 파일 손상은 DatabaseError 그 자체로 옴
+            if type(e) is sqlite3.DatabaseError:
+                if _corpus_rebuilt: _corpus_disabled = True
+                else: quarantine_corpus()
+            elif "no such module" in str(e): _corpus_disabled = True
+            return default
+
+def quarantine_corpus():
+    global _corpus_rebuilt
+    _corpus_rebuilt = True
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(CORPUS_FILE + suffix): os.replace(CORPUS_FILE + suffix, f"{CORPUS_FILE}.broken{suffix}")
+    print(f"⚠️ 손상된 코퍼스를 {CORPUS_FILE}.broken 으로 옮기고 새로 만듭니다.")
+
+def corpus_bulk_insert(table, rows, kind, title_key, body_key):
+    # rows의 첫 컬럼이 기본키. 처음 보는 행만 한 트랜잭션으로 본 테이블 + FTS 인덱스에 추가
+    if not rows: return 0
+    cols = list(rows[0].keys())
+    key = cols[0]
+    def insert(conn):
+        with conn:
+            known = {r[0] for r in conn.execute(f"SELECT {key} FROM {table} WHERE {key} IN ({','.join('?' * len(rows))})", [r[key] for r in rows])}
+            new_rows = []
+            for r in rows:
+                if r[key] in known: continue
+                known.add(r[key])
+                new_rows.append(r)
+            conn.executemany(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})", [tuple(r[c] for c in cols) for r in new_rows])
+            conn.executemany("INSERT INTO corpus_fts (kind, ref, title, body) VALUES (?, ?, ?, ?)",
+                             [(kind, r[key], r.get(title_key) or '', r.get(body_key) or '') for r in new_rows])
+        return len(new_rows)
+    return with_corpus(insert, 0)
+
+def corpus_add_articles(items):
+    return corpus_bulk_insert("articles", [{"id": c['id'], "mode": c.get('type'), "title": c['title'], "raw": c.get('raw'),
+                                            "published": c.get('published'), "fetched_at": c.get('fetched_at')} for c in items], "article", "title", "raw")
+
+def corpus_import_history(history, mode=None):
+    return corpus_bulk_insert("posted_articles", [{"id": h['id'], "title": h.get('title'), "date": h.get('date'), "mode": mode} for h in history],
+                              "history", "title", None)
+
+def corpus_add_tistory_posts(posts):
+    now = datetime.datetime.now().isoformat()
+    return corpus_bulk_insert("tistory_posts", [{"link": p['link'], "title": p['title'], "seen_at": now} for p in posts], "tistory", "title", None)
+
+def corpus_add_post(mode, subject, html_text):
+    def insert(conn):
+        with conn:
+            cur = conn.execute("INSERT INTO posts (mode, subject, html, created_at) VALUES (?, ?, ?, ?)",
+                               (mode, subject, html_text, datetime.datetime.now().isoformat()))
+            conn.execute("INSERT INTO corpus_fts (kind, ref, title, body) VALUES ('post', ?, ?, ?)", (str(cur.lastrowid), subject, post_text(html_text)))
+    with_corpus(insert, None)
+
+def corpus_posted_ids():
+    return with_corpus(lambda conn: {r[0] for r in conn.execute("SELECT id FROM posted_articles")}, set())
+
+def strip_josa(term):
+    # 검색어 쪽 조사/어미를 떼어 어간으로 접두 검색 ("엔비디아가" → "엔비디아"*), 두 글자 미만이 되면 그대로 둠
+    for suffix in KOREAN_SUFFIXES:
+        if term.endswith(suffix) and len(term) - len(suffix) >= 2: return term[:-len(suffix)]
+    return term
+
+def corpus_search(query, kind=None, limit=10):
+    # 단어별 접두 검색이라 색인 쪽 조사 변형("특허를")은 그대로 잡히고, 검색어 쪽 조사는 strip_josa로 제거. bm25 순 정렬
+    terms = list(dict.fromkeys(strip_josa(t) for t in re.findall(r"\w+", query) if len(t) > 1))[:12]
+    if not terms: return []
+    sql = "SELECT kind, ref, title FROM corpus_fts WHERE corpus_fts MATCH ?"
+    params = [" OR ".join(f'"{t}"*' for t in terms)]
+    if kind:
+        sql += " AND kind = ?"
+        params.append(kind)
+    return with_corpus(lambda conn: conn.execute(sql + " ORDER BY bm25(corpus_fts) LIMIT ?", params + [limit]).fetchall(), [])
+
+def related_published_posts(latest_posts, query, limit=15):
+    # 최근 RSS 15개 + 코퍼스에 쌓인 과거 글 중 주제와 가까운 글을 앞쪽에 배치
+    corpus_add_tistory_posts(latest_posts)
+    related = [{'title': title, 'link': ref} for _, ref, title in corpus_search(query, 'tistory', 5)]
+    merged, seen = [], set()
+    for p in related + latest_posts:
+        if p['link'] in seen: continue
+        seen.add(p['link'])
+        merged.append(p)
+    return merged[:limit]
+
+def get_candidates(mode):
+    # 수집 모드가 채워둔 저장소가 있으면 네트워크 없이 바로 사용, 없으면 기존처럼 직접 수집
+    stored = _fresh_articles(load_article_store().get(mode, {}))
+    if stored:
+        items = sorted(stored.values(), key=lambda c: c.get('published') or c.get('fetched_at') or '', reverse=True)
+    else:
+        items = []
+        # 본문은 선정 단계에서 유력 후보만 미리 받아옴 (speculative prefetch)
+        for u in prioritized_feed_urls(mode): items.extend(fetch_rss(u, mode, scrape=False))
+    corpus_add_articles(items)
+    return items
+
+def prescore_candidate(c):
+    # LLM 없이 계산하는 선정 가능성 점수: 최신성 + 피드의 과거 선정률 + 요약 분량
+    published = parse_feed_date(c.get('published'))
+    age_hours = (datetime.datetime.now(datetime.timezone.utc) - published).total_seconds() / 3600 if published else 72
+    st = get_feed_stats(c['feed']) if c.get('feed') else {}
+    select_rate = st['selected'] / st['fetches'] if st.get('fetches') else 0
+    return -age_hours / 24 + select_rate + min(len(c.get('raw') or ''), 1000) / 1000
+
+def start_prefetch(candidates):
+    # LLM이 고르는 동안 유력 후보 본문을 미리 긁기 시작
+    global _prefetch_pool
+    pending = [c for c in candidates if not c.get('scraped', True)]
+    if not pending or deadline_short(SCRAPE_MAX_TIMEOUT): return {}
+    with _shared_lock:
+        if _prefetch_pool is None: _prefetch_pool = lazy_import('concurrent.futures').ThreadPoolExecutor(max_workers=SPECULATIVE_PREFETCH * ENGINE_CONCURRENCY)
+    likely = sorted(pending, key=prescore_candidate, reverse=True)[:SPECULATIVE_PREFETCH]
+    return {c['id']: _prefetch_pool.submit(scrape_candidate, c) for c in likely}
+
+def scrape_candidate(c):
+    # 선정 단계에서 긁은 본문도 피드별 본문 수집률(scrape_attempts/scraped)에 반영
+    text = scrape_article_text(c['id'])
+    if c.get('feed'):
+        with _shared_lock:
+            st = get_feed_stats(c['feed'])
+            st['scrape_attempts'] += 1
+            if text: st['scraped'] += 1
+    return text
+
+def finish_prefetch(selected, prefetched):
+    # 선정된 2개는 본문을 확보하고, 나머지 예약 작업은 취소
+    hits = 0
+    for c in selected:
+        if c.get('scraped', True): continue
+        future = prefetched.pop(c['id'], None)
+        if future is not None:
+            hits += 1
+            try: text = future.result()
+            except Exception: text = None
+        elif deadline_short(SCRAPE_MAX_TIMEOUT):
+            note_degradation("본문 수집 대신 RSS 요약 사용")
+            text = None
+        else: text = scrape_candidate(c)
+        if text: c['raw'] = text
+        c['scraped'] = True
+    for future in prefetched.values(): future.cancel()
+    if prefetched or hits: print(f"⚡ 선행 수집 적중 {hits}/{len(selected)}, 미사용 {len(prefetched)}건 취소.")
+    return selected
+
+def _pick_top_2(filtered, category_name):
+    if len(filtered) < 2: return filtered[:2]
+    if deadline_short(LLM_CALL_ESTIMATE):
+        note_degradation("LLM 선정 대신 최신 후보 2개 사용")
+        return filtered[:2]
+    cand_txt = "\n".join([f"{i}. {c['title']}" for i, c in enumerate(filtered[:15])])
+    prompt = f"역할: 전문 투자 블로거 '스포(Spo)'.\n목표: {category_name} 분야 뉴스 2개 선정.\n[후보군]\n{cand_txt}\n조건: 숫자 2개만 반환 (예: 1, 4)."
+    try:
+        res = generate_content(prompt)
+        pace(15)
+        nums = [int(s) for s in re.findall(r'\b\d+\b', res.text)]
+        if len(nums) >= 2: return [filtered[nums[0]], filtered[nums[1]]]
+    except: pass
+    return filtered[:2]
+
+def select_top_2(candidates, history, category_name):
+    # history.json은 30일만 보관하므로 코퍼스에 남은 전체 발행 이력으로도 중복 제거
+    history_ids = {h['id'] for h in history} | corpus_posted_ids()
+    with _shared_lock: history_ids |= _reserved_ids
+    filtered = [c for c in candidates if c['id'] not in history_ids]
+    prefetched = start_prefetch(filtered[:15]) if len(filtered) > 2 else {}
+    return finish_prefetch(reserve_picks(_pick_top_2(filtered, category_name), filtered), prefetched)
+
+def reserve_picks(picks, filtered):
+    # LLM이 고르는 사이 다른 카테고리가 먼저 예약한 기사는 남은 후보 순서대로 대체
+    with _shared_lock:
+        chosen, seen = [], set(_reserved_ids)
+        for c in picks + filtered:
+            if len(chosen) >= 2: break
+            if c['id'] in seen: continue
+            chosen.append(c)
+            seen.add(c['id'])
+        _reserved_ids.update(c['id'] for c in chosen)
+    return chosen
+
+def reserve_checkpointed_picks(categories):
+    # 체크포인트에서 재개하는 카테고리의 선정 결과를 새로 고르는 카테고리보다 먼저 예약
+    for category in categories:
+        restored = load_checkpoint(get_run_dir(category['name']), "selection") or []
+        with _shared_lock: _reserved_ids.update(c['id'] for c in restored)
+
+def get_catchy_korean_title(english_title):
+    if deadline_short(LLM_CALL_ESTIMATE):
+        note_degradation("번역 대신 영문 제목 사용")
+        return english_title
+    prompt = f"다음 영문 뉴스 제목을 100% 한국어로 30자 이내 간결한 블로그 소제목(H2)으로 번역해. 오직 제목 1개만 출력.\n영문: {english_title}"
+    try:
+        res = generate_content(prompt).text.strip()
+        pace(15)
+        return res
+    except: return english_title
+
+def get_unified_subject(category_name, t1_kr, t2_kr):
+    if deadline_short(LLM_CALL_ESTIMATE):
+        note_degradation("기본 메일 제목 사용")
+        return f"[{category_name} 이슈] {DEFAULT_SUBJECT}"
+    prompt = f"두 뉴스 제목을 아우르는 이메일 메인 제목 작성 (최대 35자, 1개만 출력).\n주제1: {t1_kr}\n주제2: {t2_kr}"
+    try:
+        res = generate_content(prompt).text.strip()
+        pace(15)
+        return f"[{category_name} 이슈] {res}"
+    except: return f"[{category_name} 이슈] {DEFAULT_SUBJECT}"
+
+class _TagBalanceChecker(HTMLParser):
+    VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+    # 닫는 태그를 생략해도 되는 요소 (<p>…<p>, <li>…<li> 등은 정상 HTML)
+    OPTIONAL_END_TAGS = {'p', 'li', 'dt', 'dd', 'tr', 'td', 'th', 'thead', 'tbody', 'tfoot', 'option'}
+    # 열린 <p>를 암묵적으로 닫는 블록 태그
+    P_CLOSERS = {'address', 'article', 'aside', 'blockquote', 'details', 'div', 'dl', 'dd', 'dt', 'fieldset', 'figcaption', 'figure', 'footer',
+                 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'ul'}
+    IMPLIED_CLOSERS = {'li': {'li'}, 'dt': {'dt', 'dd'}, 'dd': {'dt', 'dd'}, 'td': {'td', 'th', 'tr', 'thead', 'tbody', 'tfoot'},
+                       'th': {'td', 'th', 'tr', 'thead', 'tbody', 'tfoot'}, 'tr': {'tr', 'thead', 'tbody', 'tfoot'},
+                       'thead': {'tbody', 'tfoot'}, 'tbody': {'tbody', 'tfoot'}, 'option': {'option', 'optgroup'}}
+
+    def __init__(self):
+        super().__init__()
+        self.stack, self.stray = [], 0
+
+    def handle_starttag(self, tag, attrs):
+        # 새 태그가 열리면서 암묵적으로 닫히는 요소는 스택에서 제거
+        while self.stack and tag in (self.P_CLOSERS if self.stack[-1] == 'p' else self.IMPLIED_CLOSERS.get(self.stack[-1], ())):
+            self.stack.pop()
+        if tag not in self.VOID_TAGS: self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.VOID_TAGS: return
+        if tag not in self.stack:
+            self.stray += 1
+            return
+        # <p><strong></p> 처럼 안쪽 태그가 안 닫힌 채 바깥 태그가 닫힌 경우도 오류로 집계 (닫는 태그 생략 가능 요소는 제외)
+        while True:
+            top = self.stack.pop()
+            if top == tag: break
+            if top not in self.OPTIONAL_END_TAGS: self.stray += 1
+
+def unclosed_tags(html_text):
+    checker = _TagBalanceChecker()
+    checker.feed(html_text)
+    checker.close()
+    return [t for t in checker.stack if t not in checker.OPTIONAL_END_TAGS], checker.stray
+
+def post_text(html_text):
+    return re.sub(r"\s+", " ", html.unescape(re.sub(r"<[^>]+>", " ", html_text))).strip()
+
+def validate_post(html_text, target_length, need_link):
+    # 모델 재호출 없이 로컬에서 바로 확인 가능한 항목만 검사
+    problems = []
+    text = post_text(html_text)
+    if POST_GREETING not in text[:200]: problems.append("greeting")
+    if len(text) < target_length * POST_MIN_LENGTH_RATIO: problems.append("length")
+    if need_link and not re.search(r"\[링크:\s*.+?\]", html_text): problems.append("link")
+    for n in (1, 2):
+        if f"[IMAGE_PLACEHOLDER_{n}]" not in html_text: problems.append(f"image{n}")
+    stack, stray = unclosed_tags(html_text)
+    if stack or stray: problems.append("html")
+    return problems
+
+def split_sections(html_text):
+    # <h2> 기준으로 [도입부, 본문1, 본문2, ...] 로 분리
+    return re.split(r"(?=<h2[\s>])", html_text)
+
+def regenerate_section(section_html, instruction):
+    if deadline_short(LLM_CALL_ESTIMATE):
+        note_degradation("부분 재생성 생략")
+        return section_html
+    prompt = f"""다음은 블로그 글의 일부 HTML입니다. 아래 지시대로 이 부분만 고쳐서 순수 HTML로만 출력하세요.
+    [지시] {instruction}
+    [규칙] [IMAGE_PLACEHOLDER_1], [IMAGE_PLACEHOLDER_2], [링크: ...] 표기와 기존 <a> 태그는 그대로 유지.
+    [원본]
+    {section_html}"""
+    try:
+        res = generate_content(prompt)
+        pace(15)
+        fixed = re.sub(r"```[a-zA-Z]*\n?|```", "", res.text).strip()
+        return fixed if fixed else section_html
+    except: return section_html
+
+def repair_post(html_text, problems, target_length, published_posts):
+    # 전체 재작성 대신 실패한 구간만 부분 재생성하고, 나머지는 로컬에서 보정
+    sections = split_sections(html_text)
+    if "greeting" in problems:
+        sections[0] = regenerate_section(sections[0], f'도입부가 반드시 "{POST_GREETING}" 라는 첫인사로 시작하도록 고치세요. 나머지 내용과 말투는 유지.')
+        if POST_GREETING not in post_text(sections[0])[:200]: sections[0] = f"<p>{POST_GREETING}</p>\n" + sections[0]
+    if "length" in problems and len(sections) > 1:
+        deficit = target_length - len(post_text("".join(sections)))
+        idx = min(range(1, min(3, len(sections))), key=lambda i: len(post_text(sections[i])))
+        sections[idx] = regenerate_section(sections[idx], f"이 단락의 분석을 공백 포함 약 {deficit}자 더 길고 깊이 있게 보강하세요. 제목(h2)은 유지.")
+    if "link" in problems and published_posts:
+        titles = "\n".join(f"- {p['title']}" for p in published_posts)
+        sections[-1] = regenerate_section(sections[-1], f"아래 이전 글 목록 중 가장 잘 맞는 글 1개를 골라 [링크: 글 제목] 형태로 본문 문장 속에 자연스럽게 한 번 언급하세요.\n{titles}")
+    html_text = "".join(sections)
+    # 이미지 자리 표시는 모델 없이 n번째 본문 단락의 제목 바로 뒤에 직접 삽입
+    for n in (1, 2):
+        if f"[IMAGE_PLACEHOLDER_{n}]" in html_text: continue
+        sections = split_sections(html_text)
+        if len(sections) > n: sections[n] = re.sub(r"(</h2>)", lambda m: f"{m.group(1)}\n[IMAGE_PLACEHOLDER_{n}]", sections[n], count=1)
+        else: sections.append(f"\n[IMAGE_PLACEHOLDER_{n}]")
+        html_text = "".join(sections)
+    if "html" in problems:
+        # 태그 짝이 틀린 구간만 부분 재생성하고, 그래도 안 닫힌 태그는 글 끝에서 역순으로 닫음
+        sections = split_sections(html_text)
+        for i, section in enumerate(sections):
+            if any(unclosed_tags(section)):
+                sections[i] = regenerate_section(section, "열고 닫는 HTML 태그의 짝이 맞도록 고치세요. 내용과 말투는 유지.")
+        html_text = "".join(sections)
+        stack, _ = unclosed_tags(html_text)
+        html_text += "".join(f"</{tag}>" for tag in reversed(stack))
+    return html_text
+
+def write_blog_post(topic1, topic2, category_name, t1_kr, t2_kr, published_posts, disclaimer):
+    history_text = "이전 발행 글 없음"
+    if published_posts:
+        history_titles = [p['title'] for p in published_posts]
+        history_text = "\n".join([f"- {title}" for title in history_titles])
+        link_rule = """3. 🚨 내부 링크 강제 주입 (절대 누락 금지):
+       아래 제공된 [이전 발행 글 목록] 중 가장 잘 맞는 글 1개를 무조건 선택해서 본문 문장 속에 자연스럽게 언급하세요.
+       언급할 때는 반드시 대괄호를 사용하여 [링크: 선택한 이전 글 제목] 형태로 정확히 적어야 합니다. (오타 주의, 목록에 있는 제목 그대로 복사)
+       (작성 예시: "최근 흐름은 지난번 다루었던 [링크: 이전 글 제목] 포스팅과 비슷한 맥락입니다.")"""
+    else:
+        link_rule = "3. 내부 링크: 이전 발행 글이 없으므로 생략합니다."
+
+    include_table = random.choice([True, False]) 
+    if include_table:
+        table_styles = [
+            "모던 스타일 (border-collapse: collapse; border-bottom: 1px solid #ddd;)",
+            "클래식 스타일 (border-collapse: collapse; 짝수 행 배경색)",
+            "심플 스타일 (border-collapse: collapse; 테두리 연하게)"
+        ]
+        t_style = random.choice(table_styles)
+        table_instruction = f"- 비교표: 글 중간에 <table> 1개 삽입. 디자인: [{t_style}] 적용."
+    else:
+        table_instruction = ""
+
+    writing_styles = [
+        "최근 시장의 변동성이나 하락장에 대한 '피로감'을 솔직하게 털어놓으며 독자와 공감대를 형성하는 에세이 형식",
+        "새로운 혁신 기술이나 신약 발표를 보며 느끼는 투자자로서의 '설렘'과 '기대감'을 담은 긍정적인 도입부",
+        "감정을 완전히 배제하고, 철저히 팩트와 숫자, 시장의 논리에만 집중하여 냉철하고 날카롭게 시작하는 도입부",
+        "친밀한 지인과 커피 한잔하며 '요즘 시장에 진짜 재밌는/어이없는 일이 있었는데 말이야'라고 썰을 푸는 듯한 위트 있는 말투"
+    ]
+    chosen_style = random.choice(writing_styles)
+
+    # 💡 [핵심 추가] 매일 바뀌는 목표 글자 수와 심층 서술 방식 (1500~2200자)
+    target_length = random.randint(1500, 2200)
+    expansion_strategies = [
+        "관련 시장의 반응과 경쟁사들의 움직임을 비교 분석하여 깊이를 더하세요.",
+        "해당 기술/이슈의 장단점 3가지를 조목조목 분석하여 독자의 이해를 도우세요.",
+        "과거의 유사한 혁신 사례나 투자 관점에서의 히스토리를 끌어와 풍성하게 설명하세요."
+    ]
+    chosen_expansion = random.choice(expansion_strategies)
+
+    dynamic_structure_rule = f"""
+    [미션: 100% 인간이 쓴 듯한 고품질 실전 투자 포스팅 작성]
+    
+    1. 자연스러운 어투: 딱딱하고 과장된 전문가 흉내를 내지 마세요. 개인 블로거로서 힘을 빼고 편안하게 작성하세요.
+    
+    2. 글의 구조 및 분량 (순서 및 분량 엄수): 
+       - 전체 글자 수는 반드시 공백 포함 {target_length}자 내외로 아주 길고 상세하게 작성해야 합니다. (구글 SEO 최적화를 위한 필수 조건)
+       - 각 뉴스 심층 분석 시, {chosen_expansion}
+       - 1단계 [도입부]: 반드시 "안녕하세요, 스포(Spo)입니다."라는 첫인사로 시작하고, [{chosen_style}]을 적용하여 자연스럽게 시작.
+       - 2단계 [첫 번째 뉴스 심층 분석]: {t1_kr}에 대한 상세 본문 (매우 깊이 있게 서술).
+       - 3단계 [두 번째 뉴스 심층 분석]: {t2_kr}에 대한 상세 본문 (매우 깊이 있게 서술).
+       - 4단계 [통합 인사이트]: 수치(PER, 밸류에이션 등)를 근거로 한 주관적 평가 1~2줄 추가하여 결론 짓기.
+       
+    {link_rule}
+       
+    4. 템플릿 완전 파괴: '용어 정리', '면책 조항', '출처' 코너를 절대로 직접 만들지 마세요. (파이썬 코드가 자동으로 추가할 예정입니다.)
+
+    [SEO 및 체류시간 부스터]
+    {table_instruction}
+    - 상장사 주가 링크: 언급된 기업 뒤에 <a> 태그 삽입 (예: <a href="https://kr.investing.com/search/?q=Apple" target="_blank">[📈주가확인]</a>)
+    - 이미지 삽입: 글 흐름에 맞춰 [IMAGE_PLACEHOLDER_1]과 [IMAGE_PLACEHOLDER_2]를 각 1번씩 삽입.
+    
+    [이전 발행 글 목록 (이 중 하나를 골라 반드시 본문에 쓸 것)]
+    {history_text}
+    """
+    
+    prompt = f"""
+    역할: 10년차 실전 투자 블로거 '스포(Spo)'.
+    주제1: {topic1['title']} / 원문: {topic1['raw']}
+    주제2: {topic2['title']} / 원문: {topic2['raw']}
+    {dynamic_structure_rule}
+    [출력 지침] 오직 순수 HTML 코드만 출력하세요.
+    """
+    try:
+        response = generate_content(prompt)
+        pace(25)
+        if not response.candidates or not response.candidates[0].content.parts: return "<p>에러: 구글 AI 차단.</p>"
+        
+        raw_html = re.sub(r"```[a-zA-Z]*\n?|```", "", response.text).strip()
+        problems = validate_post(raw_html, target_length, bool(published_posts))
+        if problems:
+            print(f"🔧 검증 실패: {', '.join(problems)} → 해당 구간만 보정.")
+            raw_html = repair_post(raw_html, problems, target_length, published_posts)
+        
+        def link_replacer(match):
+            title = match.group(1).strip()
+            target_url = None
+            for p in published_posts:
+                if title in p['title'] or p['title'] in title:
+                    target_url = p['link']
+                    break
+            
+            if target_url:
+                return f'<a href="{target_url}" target="_blank" rel="noopener" style="color: #0066cc; font-weight: bold; text-decoration: underline;">{title}</a>'
+            else:
+                encoded_title = urllib.parse.quote(title)
+                search_url = f"https://spo26.tistory.com/search/{encoded_title}"
+                return f'<a href="{search_url}" target="_blank" rel="noopener" style="color: #0066cc; font-weight: bold; text-decoration: underline;">{title}</a>'
+
+        raw_html = re.sub(r"\[링크:\s*(.*?)\]", link_replacer, raw_html)
+        
+        source_and_disclaimer_html = f"""
+        <div style="margin-top: 40px; padding: 15px; background-color: #f8f9fa; border-radius: 5px; font-size: 0.9em;">
+            <strong style="color: #2c3e50;">🔗 참고 자료 (원본 출처)</strong>
+            <ul style="margin-top: 10px; padding-left: 20px; line-height: 1.6;">
+                <li><a href="{topic1['id']}" target="_blank" style="color: #7f8c8d; text-decoration: underline;">{topic1['title']}</a></li>
+                <li><a href="{topic2['id']}" target="_blank" style="color: #7f8c8d; text-decoration: underline;">{topic2['title']}</a></li>
+            </ul>
+        </div>
+        <hr style="border: 0; border-top: 1px solid #eee; margin: 30px 0;">
+        <p style="color: #95a5a6; font-size: 0.85em; text-align: center; line-height: 1.5;">
+            * {disclaimer}<br>
+            투자의 최종 책임은 본인에게 있으며, 시장 상황에 따라 변동성이 발생할 수 있습니다.<br>
+            <strong>Editor: 스포(Spo)</strong>
+        </p>
+        """
+        
+        return raw_html + source_and_disclaimer_html
+        
+    except Exception as e: return f"<h3>🚨 AI API 에러</h3><p>{str(e)}</p>"
+
+def unsplash_sized_url(raw_url, width):
+    # Unsplash raw URL의 imgix 파라미터로 원하는 폭의 webp 생성
+    sep = '&' if '?' in raw_url else '?'
+    return f"{raw_url}{sep}w={width}&q=75&fm=webp&fit=max"
+
+def get_image_tag(keyword, used_urls, alt_text=""):
+    url = f"https://api.unsplash.com/search/photos?query={keyword}&per_page=5&orientation=landscape&client_id={UNSPLASH_ACCESS_KEY}"
+    try:
+        data = lazy_import('requests').get(url, timeout=5).json()
+        if not data.get('results'): return ""
+        photo = None
+        for res in data['results']:
+            if res['urls']['raw'] not in used_urls:
+                photo = res
+                break
+        if not photo: photo = data['results'][0]
+        raw_url = photo['urls']['raw']
+        used_urls.add(raw_url)
+        # 원본 비율대로 width/height를 지정해 레이아웃 이동(CLS) 방지
+        width = IMAGE_DISPLAY_WIDTH
+        height = round(width * photo['height'] / photo['width']) if photo.get('width') and photo.get('height') else round(width * 2 / 3)
+        srcset = ", ".join(f"{unsplash_sized_url(raw_url, w)} {w}w" for w in IMAGE_WIDTHS)
+        return (f'<figure style="margin: 30px 0;">\n'
+                f'    <img src="{unsplash_sized_url(raw_url, width)}" srcset="{srcset}" sizes="(max-width: 800px) 100vw, 800px" '
+                f'width="{width}" height="{height}" loading="lazy" decoding="async" alt="{alt_text}" '
+                f'style="width:100%; height:auto; border-radius:12px;" />\n</figure>')
+    except: return ""
+
+def inject_images(html_text, t1, t2, mode):
+    fb_defaults = get_category(mode)['image_fallbacks']
+    try:
+        if deadline_short(LLM_CALL_ESTIMATE):
+            note_degradation("기본 이미지 키워드 사용")
+            raise TimeoutError
+        prompt = f"""주제1({t1['title']})과 주제2({t2['title']})에 어울리는 Unsplash 영문 검색 키워드 2개와, 구글 SEO에 최적화된 구체적인 한국어 이미지 설명(alt 태그용) 2개를 추출해.
+        출력 형식(JSON): {{"k1": "영문키워드1", "alt1": "주제1을 구체적으로 묘사하는 한국어 짧은 문장", "k2": "영문키워드2", "alt2": "주제2를 구체적으로 묘사하는 한국어 짧은 문장"}}"""
+        
+        res = generate_content(prompt).text.strip()
+        pace(15)
+        json_str = re.sub(r"```[a-zA-Z]*\n?|```", "", res).strip()
+        keywords = json.loads(json_str)
+        
+        k1 = keywords.get("k1", fb_defaults[0])
+        alt1 = keywords.get("alt1", f"{t1['title']} 관련 시각 자료")
+        k2 = keywords.get("k2", fb_defaults[1])
+        alt2 = keywords.get("alt2", f"{t2['title']} 관련 시각 자료")
+        
+    except: 
+        k1, k2 = fb_defaults[0], fb_defaults[1]
+        alt1, alt2 = f"{t1['title']} 참고 이미지", f"{t2['title']} 참고 이미지"
+    
+    if deadline_short(10):
+        note_degradation("이미지 생략")
+        return html_text.replace("[IMAGE_PLACEHOLDER_1]", "").replace("[IMAGE_PLACEHOLDER_2]", "")
+    used_urls = set() 
+    html_text = html_text.replace("[IMAGE_PLACEHOLDER_1]", get_image_tag(k1, used_urls, alt1))
+    html_text = html_text.replace("[IMAGE_PLACEHOLDER_2]", get_image_tag(k2, used_urls, alt2)) 
+    return html_text
+
+def build_email(subject, final_content):
+    if EMAIL_COMPACT:
+        # multipart/alternative(텍스트 + 렌더링 HTML 1회) + 원본 HTML 첨부(post.html)
+        msg = lazy_import('email.message').EmailMessage()
+        msg.set_content(f"스포(Spo)님, 새 포스팅입니다. 원본 HTML은 첨부파일(post.html)을 사용하세요.\n\n{post_text(final_content)[:300]}...")
+        msg.add_alternative(final_content, subtype='html')
+        msg.add_attachment(final_content.encode('utf-8'), maintype='text', subtype='html', filename='post.html')
+    else:
+        escaped_html = html.escape(final_content)
+        email_body = f"""
+    <div style="font-family: sans-serif; max-width: 800px; margin: 0 auto;">
+        <h2>스포(Spo)님, 새 포스팅 HTML입니다!</h2>
+        <textarea style="width: 100%; height: 300px; font-family: monospace; font-size: 13px; padding: 10px;" readonly>{escaped_html}</textarea>
+        <hr /><h3>👀 포스팅 미리보기</h3><div style="border: 1px solid #ccc; padding: 20px; line-height: 1.6;">{final_content}</div>
+    </div>
+    """
+        MIMEText = lazy_import('email.mime.text').MIMEText
+        msg = lazy_import('email.mime.multipart').MIMEMultipart()
+        msg.attach(MIMEText(email_body, 'html'))
+    msg['From'] = GMAIL_USER
+    msg['To'] = GMAIL_USER 
+    msg['Subject'] = subject
+    return msg
+
+def get_smtp():
+    # 한 번 인증한 연결을 스풀의 모든 메일 발송에 재사용
+    global _smtp
+    if _smtp is None:
+        smtplib = lazy_import('smtplib')
+        _smtp = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=30) if SMTP_USE_SSL else smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+        if GMAIL_APP_PASSWORD: _smtp.login(GMAIL_USER, GMAIL_APP_PASSWORD)
+    return _smtp
+
+def close_smtp():
+    global _smtp
+    if _smtp is None: return
+    try: _smtp.quit()
+    except Exception: pass
+    _smtp = None
+
+def spool_email(msg):
+    os.makedirs(OUTBOX_DIR, exist_ok=True)
+    path = os.path.join(OUTBOX_DIR, f"{time.time_ns()}_{os.getpid()}.eml")
+    with open(path + '.tmp', 'wb') as f: f.write(msg.as_bytes())
+    os.replace(path + '.tmp', path)
+    return path
+
+def pending_outbox():
+    if not os.path.isdir(OUTBOX_DIR): return []
+    return sorted(n for n in os.listdir(OUTBOX_DIR) if n.endswith('.eml'))
+
+def quarantine_email(name, reason):
+    # 읽을 수 없거나 서버가 영구 거부한 스풀 파일은 격리해서 뒤에 쌓인 메일 발송을 막지 않게 함
+    os.makedirs(OUTBOX_QUARANTINE_DIR, exist_ok=True)
+    os.replace(os.path.join(OUTBOX_DIR, name), os.path.join(OUTBOX_QUARANTINE_DIR, name))
+    print(f"🚨 스풀 메일 격리 ({reason}): {name}")
+
+def is_permanent_rejection(error):
+    # 메시지 자체에 대한 5xx 거부 (인증 실패는 연결 문제로 보고 제외)
+    smtplib = lazy_import('smtplib')
+    if isinstance(error, smtplib.SMTPAuthenticationError): return False
+    if isinstance(error, smtplib.SMTPRecipientsRefused): return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+def deliver_outbox():
+    # 스풀을 오래된 순서로 비움. 메일마다 2s, 4s 백오프로 재시도하고, 끝내 실패하면 나머지는 다음 실행으로
+    names = pending_outbox()
+    if not names: return 0, 0
+    parser, policy = lazy_import('email.parser'), lazy_import('email.policy')
+    sent = 0
+    for name in names:
+        path = os.path.join(OUTBOX_DIR, name)
+        try:
+            with open(path, 'rb') as f: msg = parser.BytesParser(policy=policy.default).parse(f)
+            if not msg['To']: raise ValueError("수신자 없음")
+        except Exception:
+            quarantine_email(name, "손상")
+            continue
+        for attempt in range(OUTBOX_RETRIES):
+            try:
+                get_smtp().send_message(msg)
+                os.remove(path)
+                sent += 1
+                break
+            except Exception as e:
+                if is_permanent_rejection(e):
+                    # 재시도해도 같은 결과이므로 이 메일만 빼고 다음 메일로 (연결은 그대로 사용)
+                    quarantine_email(name, f"서버 거부 {getattr(e, 'smtp_code', '')}".strip())
+                    break
+                close_smtp()
+                if attempt + 1 < OUTBOX_RETRIES: time.sleep(2 ** (attempt + 1))
+        else:
+            # 연결/인증 실패는 나머지 메일도 같을 것이므로 다음 실행으로
+            print(f"🚨 메일 발송 실패, 스풀에 보관: {name}")
+            break
+    return sent, len(pending_outbox())
+
+def report_undelivered():
+    # sent 체크포인트와 history는 스풀 시점에 기록되므로, 캐시가 밀리면 사라질 수 있는 미발송 메일을 실행 끝에 남김
+    names = pending_outbox()
+    if not names: return
+    parser, policy = lazy_import('email.parser'), lazy_import('email.policy')
+    print(f"📮 미발송 스풀 {len(names)}건 ({OUTBOX_DIR}, 다음 실행에서 재시도):")
+    for name in names:
+        try:
+            with open(os.path.join(OUTBOX_DIR, name), 'rb') as f: subject = parser.BytesHeaderParser(policy=policy.default).parse(f)['Subject']
+        except Exception: subject = None
+        print(f"  - {name}: {subject}")
+
+def send_email(subject, final_content):
+    # 스풀에 먼저 기록해서 발송 실패로 글이 유실되지 않게 함. 실제 발송은 모든 카테고리가 끝난 뒤
+    # main()이 연결 하나로 일괄 처리 (OUTBOX_DEFER=1 이면 --flush-outbox 단계에서)
+    try:
+        spool_email(build_email(subject, final_content))
+        return True
+    except: return False
+
+def process_and_send(mode, category_korean, history, run_deadline=None):
+    # 전체 실행 시간 예산을 걸고, 부족하면 단계별로 품질을 낮춰서라도 끝까지 진행
+    # 여러 카테고리가 같이 돌 때는 실행 전체 마감(run_deadline)의 남은 시간을 이 카테고리 단계들에 나눠 줌
+    budget = max(0, run_deadline.left()) if run_deadline else RUN_BUDGET_SECONDS
+    deadline = RunDeadline(budget, STAGE_BUDGET_SHARES)
+    mode_token, deadline_token = _current_mode.set(mode), _deadline.set(deadline)
+    run_dir = get_run_dir(mode)
+    try: return _process_and_send(mode, category_korean, history, run_dir)
+    finally:
+        if deadline.degraded:
+            print(f"⏳ [{category_korean}] 적용된 성능 저하 목록:")
+            for key, count in deadline.degraded.items(): print(f"  - {key} (x{count})")
+            save_checkpoint(run_dir, "degradations", deadline.degraded)
+        _deadline.reset(deadline_token)
+        _current_mode.reset(mode_token)
+
+def _process_and_send(mode, category_korean, history, run_dir):
+    corpus_import_history(history)
+    candidates = run_stage(run_dir, "candidates", lambda: get_candidates(mode), valid=bool)
+    selected = run_stage(run_dir, "selection", lambda: record_feed_selection(select_top_2(candidates, history, category_korean)), valid=lambda s: len(s) >= 2)
+    if len(selected) < 2: return []
+    
+    # 에러로 원문/기본값이 대신 들어간 결과는 저장하지 않고 재실행 때 다시 시도 (마감 때문에 낮춘 결과는 그대로 저장)
+    t1_kr, t2_kr = run_stage(run_dir, "titles", lambda: [get_catchy_korean_title(selected[0]['title']), get_catchy_korean_title(selected[1]['title'])],
+                             valid=lambda t: degraded_with("titles", "번역 대신 영문 제목 사용") or (t[0] != selected[0]['title'] and t[1] != selected[1]['title']))
+    
+    selected[0]['title'] = t1_kr
+    selected[1]['title'] = t2_kr
+
+    def generate():
+        published_posts = related_published_posts(get_tistory_published_posts(), f"{t1_kr} {t2_kr}")
+        return write_blog_post(selected[0], selected[1], category_korean, t1_kr, t2_kr, published_posts, get_category(mode)['disclaimer'])
+
+    raw_html = run_stage(run_dir, "raw_html", generate, valid=lambda h: not is_generation_error(h))
+    final_tistory_content = run_stage(run_dir, "final_html", lambda: inject_images(raw_html, selected[0], selected[1], mode),
+                                      valid=lambda h: degraded_with("final_html", "이미지 생략") or h.count("<img") >= raw_html.count("[IMAGE_PLACEHOLDER_"))
+    
+    subject = run_stage(run_dir, "subject", lambda: get_unified_subject(category_korean, t1_kr, t2_kr),
+                        valid=lambda s: degraded_with("subject", "기본 메일 제목 사용") or not s.endswith(DEFAULT_SUBJECT))
+    if load_checkpoint(run_dir, "sent") is None:
+        _deadline.get().begin("send")
+        # 발송 실패 시 history를 건드리지 않고, 다음 실행이 체크포인트에서 재발송
+        if not profile_stage(run_dir, "send", lambda: send_email(subject, final_tistory_content)):
+            print("🚨 이메일 발송 실패. 다음 실행에서 재개합니다.")
+            return []
+        save_checkpoint(run_dir, "sent", {"subject": subject, "sent_at": datetime.datetime.now().isoformat()})
+        corpus_add_post(mode, subject, final_tistory_content)
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        corpus_import_history([{"id": item['id'], "title": item['title'], "date": today} for item in selected], mode)
+    return selected
+
+def run_category(category, history, run_deadline=None):
+    print(f"💡 [{category['label']}] 포스팅 시작.")
+    try: return process_and_send(category['name'], category['label'], history, run_deadline)
+    except Exception as e:
+        # 한 카테고리 실패가 다른 카테고리 결과까지 날리지 않도록 격리
+        print(f"🚨 [{category['label']}] 실패: {e}")
+        return []
+
+def run_ingest(category):
+    try: return ingest_candidates(category['name'])
+    except Exception as e:
+        print(f"🚨 [{category['label']}] 수집 실패: {e}")
+        return 0
+
+def fan_out(fn, categories):
+    # 카테고리별 작업을 제한된 동시성으로 병렬 실행 (--profile 중에는 tracemalloc이 전역이라 순차 실행)
+    if not categories: return []
+    workers = 1 if PROFILE_STAGES else max(1, min(ENGINE_CONCURRENCY, len(categories)))
+    with lazy_import('concurrent.futures').ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, categories))
+
+def main(only=None):
+    # python engine.py [--category TECH ...] [--ingest | --flush-outbox] [--feed-report] [--startup-report] [--profile]
+    only = only or [sys.argv[i + 1] for i, arg in enumerate(sys.argv[:-1]) if arg == "--category"]
+    categories = [c for c in load_registry() if not only or c['name'] in only]
+    history = load_history(HISTORY_FILE)
+    kst_now = datetime.datetime.now() + datetime.timedelta(hours=9)
+    weekday = kst_now.weekday()
+    
+    if "--ingest" in sys.argv:
+        fan_out(run_ingest, categories)
+    elif "--flush-outbox" in sys.argv:
+        sent, left = deliver_outbox()
+        print(f"📮 스풀 발송 {sent}건, 남은 {left}건.")
+        report_undelivered()
+    else:
+        due = [c for c in categories if weekday in c['schedule']['weekdays']]
+        reserve_checkpointed_picks(due)
+        # 마감은 실행 전체에 하나: 동시 실행 수(ENGINE_CONCURRENCY)보다 카테고리가 많아도 늦게 시작한 카테고리가 새 예산을 받지 않음
+        run_deadline = RunDeadline(RUN_BUDGET_SECONDS, {})
+        results = fan_out(lambda c: run_category(c, history, run_deadline), due)
+        items = [item for selected in results for item in selected]
+        if items: save_history(HISTORY_FILE, history, items)
+        if due and not OUTBOX_DEFER:
+            deliver_outbox()
+            report_undelivered()
+    save_host_stats()
+    save_feed_stats()
+    close_corpus()
+    close_smtp()
+    if "--feed-report" in sys.argv:
+        for c in categories: print_feed_report(c['name'])
+    if "--startup-report" in sys.argv or os.environ.get("STARTUP_REPORT") == "1": print_startup_report()
+
+if __name__ == "__main__":
+    main()